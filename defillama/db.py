@@ -0,0 +1,33 @@
+import sqlite3
+
+DB_PATH = 'defillama_data.db'
+
+# WAL with relaxed syncing: commits skip the extra fsync and readers
+# proceed without blocking a running scraper
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+# Open connections keyed by database path, shared by every caller in the process
+_connections = {}
+
+
+def get_conn(db_path=DB_PATH):
+    """Return the shared connection for db_path, opening and configuring it on first use"""
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _connections[db_path] = conn
+    return conn
+
+
+def close_conn(db_path=DB_PATH):
+    """Close the shared connection for db_path, if one is open"""
+    conn = _connections.pop(db_path, None)
+    if conn is not None:
+        conn.close()
@@ -4,4 +4,7 @@ class DefillamaItem(scrapy.Item):
     protocol = scrapy.Field()
     market_cap = scrapy.Field()
     annual_revenue = scrapy.Field()
-    pe_ratio = scrapy.Field()
\ No newline at end of file
+    pe_ratio = scrapy.Field()
+    # Numeric values parsed once by the pipeline and written to the database
+    market_cap_num = scrapy.Field()
+    annual_revenue_num = scrapy.Field()
@@ -1,51 +1,103 @@
-import sqlite3
-from datetime import datetime
+import functools
+
+from defillama.db import close_conn, get_conn
+
+# Multipliers for the magnitude suffixes DefiLlama uses on dollar amounts
+_SUFFIX_MULTIPLIERS = {'b': 1_000_000_000, 'm': 1_000_000, 'k': 1_000}
+# Translation table dropping dollar signs and thousands separators in one pass
+_STRIP_CHARS = str.maketrans('', '', '$,')
 
 class DefillamaPipeline:
+    # pe_ratio is a virtual generated column, so SQLite derives it from the
+    # stored market cap and revenue instead of Python formatting and reparsing it
+    CREATE_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS defillama_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            ticker TEXT NOT NULL,
+            price REAL,
+            market_cap REAL,
+            annualized_revenue REAL,
+            pe_ratio REAL GENERATED ALWAYS AS (
+                CASE WHEN market_cap <> 0 AND annualized_revenue > 0
+                THEN ROUND(market_cap / annualized_revenue, 2) END
+            ) VIRTUAL
+        )
+    '''
+    # Kept as a constant so sqlite3's statement cache reuses one prepared statement.
+    # SQLite stamps each row in local time (as datetime.now() used to), so no
+    # Python datetime is created and adapted per insert.
+    INSERT_SQL = '''
+        INSERT INTO defillama_metrics 
+        (timestamp, ticker, price, market_cap, annualized_revenue)
+        VALUES (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'), ?, ?, ?, ?)
+    '''
+    # Number of buffered rows written per transaction
+    BATCH_SIZE = 200
+    
     def __init__(self):
         self.conn = None
         self.cursor = None
+        self._buffer = []
         self.setup_database()
     
     def setup_database(self):
         """Initialize SQLite database and create table if it doesn't exist"""
-        self.conn = sqlite3.connect('defillama_data.db')
+        # One shared connection (WAL, synchronous=NORMAL) held for every item
+        self.conn = get_conn()
         self.cursor = self.conn.cursor()
         
         # Create table with the specified structure
+        self.cursor.execute(self.CREATE_TABLE_SQL)
+        self._migrate_pe_ratio_column()
+        
+        # Indexes backing the latest-entry-per-ticker and time-ordered queries
         self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS defillama_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                ticker TEXT NOT NULL,
-                price REAL,
-                market_cap REAL,
-                annualized_revenue REAL,
-                pe_ratio REAL
-            )
+            CREATE INDEX IF NOT EXISTS idx_ticker_id
+            ON defillama_metrics (ticker, id DESC)
+        ''')
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_timestamp
+            ON defillama_metrics (timestamp DESC)
         ''')
         self.conn.commit()
     
-    def process_item(self, item, spider):
-        # Store original values for P/E calculation
-        original_market_cap = item.get("market_cap")
-        original_annual_revenue = item.get("annual_revenue")
+    def _migrate_pe_ratio_column(self):
+        """Rebuild tables created with a stored pe_ratio column to use the generated one"""
+        # table_xinfo reports hidden=0 for ordinary columns, 2/3 for generated ones
+        columns = self.cursor.execute("PRAGMA table_xinfo(defillama_metrics)").fetchall()
+        if not any(col[1] == "pe_ratio" and col[6] == 0 for col in columns):
+            return
         
+        # Dropping the renamed table also drops its indexes; they are recreated afterwards
+        self.cursor.executescript(f'''
+            BEGIN;
+            ALTER TABLE defillama_metrics RENAME TO defillama_metrics_legacy;
+            {self.CREATE_TABLE_SQL};
+            INSERT INTO defillama_metrics
+            (id, timestamp, ticker, price, market_cap, annualized_revenue)
+            SELECT id, timestamp, ticker, price, market_cap, annualized_revenue
+            FROM defillama_metrics_legacy;
+            DROP TABLE defillama_metrics_legacy;
+            COMMIT;
+        ''')
+        print("Migrated defillama_metrics to a generated pe_ratio column")
+    
+    def process_item(self, item, spider):
         # Basic cleaning: remove unwanted characters or format numbers for display
         for field in ["market_cap", "annual_revenue"]:
             if item.get(field) and isinstance(item[field], str):
                 item[field] = item[field].replace("$", "").replace(",", "").strip()
         
-        # Calculate P/E ratio using original values
-        if original_market_cap and original_annual_revenue and original_market_cap != "Not found" and original_annual_revenue != "Not found":
-            market_cap_num = self._convert_to_number(original_market_cap.strip())
-            annual_revenue_num = self._convert_to_number(original_annual_revenue.strip())
-            
-            if market_cap_num and annual_revenue_num and annual_revenue_num > 0:
-                pe_ratio = market_cap_num / annual_revenue_num
-                item["pe_ratio"] = f"{pe_ratio:.2f}"
-            else:
-                item["pe_ratio"] = "Not calculable"
+        # Parse each value once and carry the numbers on the item
+        market_cap_num = self._convert_to_number(item.get("market_cap", "0"))
+        annual_revenue_num = self._convert_to_number(item.get("annual_revenue", "0"))
+        item["market_cap_num"] = market_cap_num
+        item["annual_revenue_num"] = annual_revenue_num
+        
+        # P/E for the exported item only; the database computes its own pe_ratio
+        if market_cap_num and annual_revenue_num and annual_revenue_num > 0:
+            item["pe_ratio"] = f"{market_cap_num / annual_revenue_num:.2f}"
         else:
             item["pe_ratio"] = "Not calculable"
         
@@ -55,48 +107,50 @@ class DefillamaPipeline:
         return item
     
     def store_in_database(self, item):
-        """Store the scraped data in SQLite database"""
+        """Queue the scraped data for the next batched insert"""
+        self._buffer.append((
+            item.get("protocol", ""),
+            None,  # Price not available in current scraping
+            item.get("market_cap_num"),
+            item.get("annual_revenue_num")
+        ))
+        if len(self._buffer) >= self.BATCH_SIZE:
+            self.flush()
+    
+    def flush(self):
+        """Write all buffered rows in a single transaction"""
+        if not self._buffer:
+            return
         try:
-            # Convert values to numbers for database storage
-            market_cap_num = self._convert_to_number(item.get("market_cap", "0"))
-            annual_revenue_num = self._convert_to_number(item.get("annual_revenue", "0"))
-            pe_ratio_num = float(item.get("pe_ratio", "0")) if item.get("pe_ratio") != "Not calculable" else None
-            
-            # Insert data into database
-            self.cursor.execute('''
-                INSERT INTO defillama_metrics 
-                (timestamp, ticker, price, market_cap, annualized_revenue, pe_ratio)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now(),
-                item.get("protocol", ""),
-                None,  # Price not available in current scraping
-                market_cap_num,
-                annual_revenue_num,
-                pe_ratio_num
-            ))
+            self.cursor.executemany(self.INSERT_SQL, self._buffer)
             self.conn.commit()
-            print(f"Stored data for {item.get('protocol')} in database")
+            print(f"Stored {len(self._buffer)} rows in database")
             
         except Exception as e:
+            # Discard rows inserted before the failure so the next commit can't persist half a batch
+            self.conn.rollback()
             print(f"Error storing data in database: {e}")
+        
+        self._buffer.clear()
     
-    def _convert_to_number(self, value_str):
-        """Convert string with 'b' or 'm' suffix to number"""
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _convert_to_number(value_str):
+        """Convert string with 'b', 'm' or 'k' suffix to number (memoized per raw string)"""
         try:
-            # Remove dollar signs and clean the string
-            clean_str = value_str.replace('$', '').replace(',', '').strip()
-            
-            if 'b' in clean_str.lower():
-                return float(clean_str.lower().replace('b', '')) * 1_000_000_000
-            elif 'm' in clean_str.lower():
-                return float(clean_str.lower().replace('m', '')) * 1_000_000
-            else:
+            clean_str = value_str.translate(_STRIP_CHARS).strip()
+            multiplier = _SUFFIX_MULTIPLIERS.get(clean_str[-1:].lower())
+            if multiplier is None:
                 return float(clean_str)
+            return float(clean_str[:-1]) * multiplier
         except (ValueError, AttributeError):
             return None
     
     def close_spider(self, spider):
-        """Close database connection when spider finishes"""
+        """Flush pending rows and close database connection when spider finishes"""
         if self.conn:
-            self.conn.close()
+            try:
+                self.flush()
+            finally:
+                close_conn()
+                self.conn = None
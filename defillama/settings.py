@@ -6,8 +6,24 @@ NEWSPIDER_MODULE = "defillama.spiders"
 # Obey robots.txt rules (set to False if necessary, but check DefiLlama's robots.txt first)
 ROBOTSTXT_OBEY = True
 
-# Configure a delay to avoid overloading the server
-DOWNLOAD_DELAY = 2
+# Configure a delay to avoid overloading the server; AutoThrottle raises it
+# whenever DefiLlama responds slowly
+DOWNLOAD_DELAY = 0.5
+AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_START_DELAY = 2
+AUTOTHROTTLE_TARGET_CONCURRENCY = 2.0
+
+# Fetch several protocol pages in parallel when crawling a protocol list
+CONCURRENT_REQUESTS = 16
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
+REACTOR_THREADPOOL_MAXSIZE = 20
+
+# Cache responses briefly so immediate re-runs don't refetch every page.
+# Kept short because each crawl is stored as a fresh snapshot in the database.
+HTTPCACHE_ENABLED = True
+HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_EXPIRATION_SECS = 60
+HTTPCACHE_IGNORE_HTTP_CODES = [429, 500, 502, 503, 504]
 
 # Identify your scraper politely
 USER_AGENT = "defillama-scraper/1.0 (+your.email@example.com)"
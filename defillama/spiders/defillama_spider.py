@@ -1,37 +1,121 @@
 import scrapy
+from lxml import etree
 from defillama.items import DefillamaItem
 
+# Bytes of the page handed to the streaming parser at a time
+_FEED_CHUNK_SIZE = 8192
+
+class _MetricsTarget:
+    """lxml parser target that records the value span next to each metric label.
+
+    Matches <p> elements whose first child span mentions "Market Cap" and
+    <summary> elements whose first child span mentions the annual revenue;
+    the second child span holds the value. No tree is built, and the spider
+    stops feeding the parser once both values have been seen.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self._container = None  # open <p>/<summary> being inspected
+        self._depth = 0  # nesting depth below the container
+        self._span_count = 0  # direct child spans seen in the container
+        self._current_span = 0  # index of the direct child span being read
+        self._label = []
+        self._value = []
+
+    @property
+    def done(self):
+        return len(self.values) == 2
+
+    def start(self, tag, attrib):
+        if self._container is None:
+            if tag in ("p", "summary"):
+                self._container = tag
+                self._depth = 0
+                self._span_count = 0
+                self._current_span = 0
+                self._label = []
+                self._value = []
+            return
+
+        self._depth += 1
+        if self._depth == 1 and tag == "span":
+            self._span_count += 1
+            self._current_span = self._span_count
+
+    def end(self, tag):
+        if self._container is None:
+            return
+
+        if self._depth == 0:
+            self._record()
+            self._container = None
+            return
+
+        if self._depth == 1 and tag == "span":
+            self._current_span = 0
+        self._depth -= 1
+
+    def data(self, data):
+        if self._current_span == 1:
+            self._label.append(data)
+        elif self._current_span == 2:
+            self._value.append(data)
+
+    def close(self):
+        return self.values
+
+    def _record(self):
+        label = "".join(self._label)
+        value = "".join(self._value).strip()
+        if not value:
+            return
+
+        if self._container == "p" and "Market Cap" in label:
+            self.values.setdefault("market_cap", value)
+        elif self._container == "summary" and "Revenue" in label and "Annual" in label:
+            self.values.setdefault("annual_revenue", value)
+
+def _extract_metrics(body, encoding):
+    """Stream the page through _MetricsTarget, stopping once both metrics are found"""
+    target = _MetricsTarget()
+    parser = etree.HTMLParser(target=target, encoding=encoding)
+    for offset in range(0, len(body), _FEED_CHUNK_SIZE):
+        parser.feed(body[offset:offset + _FEED_CHUNK_SIZE])
+        if target.done:
+            return target.values
+    return parser.close() if body else target.values
+
 class DefillamaSpider(scrapy.Spider):
     name = "defillama_spider"
     allowed_domains = ["defillama.com"]
 
     def __init__(self, protocol="hyperliquid", *args, **kwargs):
         super(DefillamaSpider, self).__init__(*args, **kwargs)
-        self.start_urls = [f"https://defillama.com/protocol/{protocol}"]
-        self.protocol = protocol
+        # Accept a comma-separated list so one crawl covers several protocols
+        self.protocols = [name.strip() for name in protocol.split(",") if name.strip()]
+        self.start_urls = [f"https://defillama.com/protocol/{name}" for name in self.protocols]
 
-    def parse(self, response):
-        item = DefillamaItem()
-        item["protocol"] = self.protocol
+    def _protocol_requests(self):
+        # Tag each request with its own protocol so items never get the raw list
+        for name, url in zip(self.protocols, self.start_urls):
+            yield scrapy.Request(url, cb_kwargs={"protocol": name})
 
-        # Extract Market Cap using provided XPath
-        market_cap = response.xpath('/html/body/div/main/div/div[2]/div[1]/div/div/p[1]/span[2]/text()').get()
-        item["market_cap"] = market_cap.strip() if market_cap else "Not found"
+    async def start(self):
+        for request in self._protocol_requests():
+            yield request
 
-        # Extract Annual Revenue using provided XPath
-        annual_revenue = response.xpath('/html/body/div/main/div/div[2]/div[1]/div/div/details[2]/summary/span[2]/text()').get()
-        item["annual_revenue"] = annual_revenue.strip() if annual_revenue else "Not found"
+    def start_requests(self):
+        # Used by Scrapy versions before 2.13, which don't call start()
+        yield from self._protocol_requests()
 
-        yield item
+    def parse(self, response, protocol):
+        item = DefillamaItem()
+        item["protocol"] = protocol
 
-    def _convert_to_number(self, value_str):
-        """Convert string with 'b' or 'm' suffix to number"""
-        try:
-            if 'b' in value_str.lower():
-                return float(value_str.lower().replace('b', '')) * 1_000_000_000
-            elif 'm' in value_str.lower():
-                return float(value_str.lower().replace('m', '')) * 1_000_000
-            else:
-                return float(value_str)
-        except (ValueError, AttributeError):
-            return None
\ No newline at end of file
+        # Read both values from a streaming parse instead of building the full DOM
+        metrics = _extract_metrics(response.body, response.encoding)
+        item["market_cap"] = metrics.get("market_cap", "Not found")
+        item["annual_revenue"] = metrics.get("annual_revenue", "Not found")
+
+        yield item
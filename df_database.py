@@ -1,8 +1,8 @@
-import sqlite3
-import pandas as pd
+from defillama.db import close_conn, get_conn
 
-conn = sqlite3.connect('defillama_data.db')
-df = pd.read_sql_query("SELECT * FROM defillama_metrics ORDER BY timestamp DESC", conn)
-df['timestamp'] = pd.to_datetime(df['timestamp'])
-conn.close()
-print(df.head())
\ No newline at end of file
+# Let SQLite sort and limit instead of loading the whole table to show five rows
+conn = get_conn()
+cursor = conn.execute("SELECT * FROM defillama_metrics ORDER BY timestamp DESC LIMIT 5")
+print(*(column[0] for column in cursor.description))
+print(*cursor, sep='\n')
+close_conn()
@@ -10,12 +10,13 @@ Author: ML Assistant
 Date: 2025
 """
 
-import sqlite3
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
 
+from defillama.db import close_conn, get_conn
+
 def connect_to_database(db_path='defillama_data.db'):
     """
     Step 1: Establish connection to the SQLite database
@@ -34,8 +35,8 @@ def connect_to_database(db_path='defillama_data.db'):
         if not os.path.exists(db_path):
             raise FileNotFoundError(f"Database file '{db_path}' not found")
         
-        # Create connection
-        conn = sqlite3.connect(db_path)
+        # Reuse the process-wide connection (opened and configured on first use)
+        conn = get_conn(db_path)
         print(f"✅ Successfully connected to database: {db_path}")
         return conn
     
@@ -79,8 +80,8 @@ def get_database_info(conn):
         """)
         date_range = cursor.fetchone()
         
-        # Get table schema
-        cursor.execute("PRAGMA table_info(defillama_metrics)")
+        # Get table schema (table_xinfo also lists the generated pe_ratio column)
+        cursor.execute("PRAGMA table_xinfo(defillama_metrics)")
         columns = cursor.fetchall()
         
         info = {
@@ -103,7 +104,7 @@ def get_database_info(conn):
         print(f"❌ Error getting database info: {e}")
         return None
 
-def extract_all_data(conn):
+def extract_all_data(conn, chunksize=50_000):
     """
     Step 3: Extract all historical data from the database
     
@@ -116,8 +117,12 @@ def extract_all_data(conn):
     - Annualized revenue
     - P/E ratio
     
+    Rows are read in chunks so only one chunk of raw Python row objects is
+    alive at a time, keeping peak memory bounded for large tables.
+    
     Args:
         conn (sqlite3.Connection): Database connection
+        chunksize (int): Number of rows converted per chunk
         
     Returns:
         pandas.DataFrame: Complete historical dataset
@@ -137,11 +142,12 @@ def extract_all_data(conn):
         ORDER BY timestamp DESC
         """
         
-        # Read data into pandas DataFrame
-        df = pd.read_sql_query(query, conn)
-        
-        # Convert timestamp to datetime for better analysis
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Read data into pandas DataFrame, parsing timestamps while the frame is
+        # built instead of materializing an object column and converting it after
+        chunks = pd.read_sql_query(
+            query, conn, parse_dates={'timestamp': {'format': 'ISO8601'}}, chunksize=chunksize
+        )
+        df = pd.concat(chunks, ignore_index=True)
         
         print(f"✅ Successfully extracted {len(df)} records")
         print(f"   • Data shape: {df.shape}")
@@ -209,27 +215,32 @@ def create_analysis_dataframe(df):
     Returns:
         pandas.DataFrame: Enhanced DataFrame with analysis columns
     """
-    # Create a copy to avoid modifying original
-    analysis_df = df.copy()
+    # Sort by ticker and timestamp for proper calculations (sort_values returns a copy)
+    analysis_df = df.sort_values(['ticker', 'timestamp'])
     
-    # Sort by ticker and timestamp for proper calculations
-    analysis_df = analysis_df.sort_values(['ticker', 'timestamp'])
+    # Group on integer category codes rather than hashing ticker strings
+    analysis_df['ticker'] = analysis_df['ticker'].astype('category')
     
     # Add time-based features
-    analysis_df['date'] = analysis_df['timestamp'].dt.date
-    analysis_df['hour'] = analysis_df['timestamp'].dt.hour
-    analysis_df['minute'] = analysis_df['timestamp'].dt.minute
+    timestamps = analysis_df['timestamp'].dt
+    analysis_df = analysis_df.assign(
+        date=timestamps.date,
+        hour=timestamps.hour,
+        minute=timestamps.minute,
+    )
     
-    # Calculate changes (for numeric columns)
-    numeric_columns = ['market_cap', 'annualized_revenue', 'pe_ratio']
+    # Calculate changes (for numeric columns) from a single groupby over all of them
+    numeric_columns = [
+        column for column in ['market_cap', 'annualized_revenue', 'pe_ratio']
+        if column in analysis_df.columns
+    ]
+    grouped = analysis_df.groupby('ticker', sort=False, observed=True)[numeric_columns]
+    changes = grouped.diff()
+    pct_changes = grouped.pct_change() * 100
     
     for column in numeric_columns:
-        if column in analysis_df.columns:
-            # Calculate absolute change
-            analysis_df[f'{column}_change'] = analysis_df.groupby('ticker')[column].diff()
-            
-            # Calculate percentage change
-            analysis_df[f'{column}_pct_change'] = analysis_df.groupby('ticker')[column].pct_change() * 100
+        analysis_df[f'{column}_change'] = changes[column]
+        analysis_df[f'{column}_pct_change'] = pct_changes[column]
     
     print("✅ Enhanced DataFrame created with analysis columns")
     print(f"   • Original columns: {list(df.columns)}")
@@ -291,7 +302,7 @@ def main():
         return df, analysis_df
         
     finally:
-        conn.close()
+        close_conn()
         print("🔌 Database connection closed")
 
 if __name__ == "__main__":
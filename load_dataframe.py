@@ -6,16 +6,18 @@ This script provides easy access to the historical data as pandas DataFrames
 for analysis and exploration.
 """
 
-import sqlite3
 import pandas as pd
 import os
 
-def load_historical_data(db_path='defillama_data.db'):
+from defillama.db import get_conn
+
+def load_historical_data(db_path='defillama_data.db', chunksize=50_000):
     """
     Load all historical data from the SQLite database into a pandas DataFrame
     
     Args:
         db_path (str): Path to the SQLite database file
+        chunksize (int): Number of rows read per chunk, bounding peak memory
         
     Returns:
         pandas.DataFrame: Complete historical dataset
@@ -25,8 +27,8 @@ def load_historical_data(db_path='defillama_data.db'):
         if not os.path.exists(db_path):
             raise FileNotFoundError(f"Database file '{db_path}' not found")
         
-        # Connect to database
-        conn = sqlite3.connect(db_path)
+        # Reuse the process-wide connection instead of reopening the database
+        conn = get_conn(db_path)
         
         # Query all data
         query = """
@@ -42,13 +44,16 @@ def load_historical_data(db_path='defillama_data.db'):
         ORDER BY timestamp DESC
         """
         
-        # Load into DataFrame
-        df = pd.read_sql_query(query, conn)
-        
-        # Convert timestamp to datetime
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # Load into DataFrame, converting timestamp to datetime during the read
+        chunks = pd.read_sql_query(
+            query, conn, parse_dates={'timestamp': {'format': 'ISO8601'}}, chunksize=chunksize
+        )
+        df = pd.concat(chunks, ignore_index=True)
         
-        conn.close()
+        # Compact dtypes: few distinct tickers become category codes, metrics float32
+        metric_columns = ['price', 'market_cap', 'annualized_revenue', 'pe_ratio']
+        df['ticker'] = df['ticker'].astype('category')
+        df[metric_columns] = df[metric_columns].astype('float32')
         
         print(f"✅ Loaded {len(df)} records from database")
         print(f"📊 Data shape: {df.shape}")
@@ -75,7 +80,7 @@ def get_latest_data(df, ticker=None):
         latest = df[df['ticker'] == ticker].iloc[0] if len(df[df['ticker'] == ticker]) > 0 else None
         return latest
     else:
-        return df.groupby('ticker').first().reset_index()
+        return df.groupby('ticker', observed=True).first().reset_index()
 
 def get_data_summary(df):
     """
@@ -100,26 +105,46 @@ def get_data_summary(df):
     
     return summary
 
-# Load the data when this module is imported
-print("🔄 Loading DefiLlama historical data...")
-historical_df = load_historical_data()
+# DataFrame cached by historical_df() after the first successful load
+_historical_df = None
 
-if historical_df is not None:
-    print("✅ Data loaded successfully!")
-    print("📋 Available functions:")
-    print("   • historical_df: Complete historical dataset")
-    print("   • get_latest_data(df, ticker): Get latest data for a ticker")
-    print("   • get_data_summary(df): Get data summary")
+def historical_df(reload=False):
+    """
+    Load the historical dataset on first call and return the cached DataFrame afterwards
     
-    # Show quick summary
-    summary = get_data_summary(historical_df)
-    print(f"\n📊 Quick Summary:")
-    print(f"   • Total records: {summary['total_records']}")
-    print(f"   • Tickers: {', '.join(summary['tickers'])}")
-    print(f"   • Date range: {summary['date_range']['start']} to {summary['date_range']['end']}")
+    A failed load (None) is not cached, so the next call retries the database.
+    
+    Args:
+        reload (bool): Discard the cached DataFrame and load it again
+        
+    Returns:
+        pandas.DataFrame: Complete historical dataset, or None if loading failed
+    """
+    global _historical_df
+    if reload or _historical_df is None:
+        _historical_df = load_historical_data()
+    return _historical_df
+
+if __name__ == "__main__":
+    print("🔄 Loading DefiLlama historical data...")
+    df = historical_df()
     
-    # Show sample data
-    print(f"\n📄 Sample data:")
-    print(historical_df.head())
-else:
-    print("❌ Failed to load data") 
\ No newline at end of file
+    if df is not None:
+        print("✅ Data loaded successfully!")
+        print("📋 Available functions:")
+        print("   • historical_df(): Complete historical dataset (loaded once, then cached)")
+        print("   • get_latest_data(df, ticker): Get latest data for a ticker")
+        print("   • get_data_summary(df): Get data summary")
+        
+        # Show quick summary
+        summary = get_data_summary(df)
+        print(f"\n📊 Quick Summary:")
+        print(f"   • Total records: {summary['total_records']}")
+        print(f"   • Tickers: {', '.join(summary['tickers'])}")
+        print(f"   • Date range: {summary['date_range']['start']} to {summary['date_range']['end']}")
+        
+        # Show sample data
+        print(f"\n📄 Sample data:")
+        print(df.head())
+    else:
+        print("❌ Failed to load data")
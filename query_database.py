@@ -3,14 +3,15 @@
 Database query utility for defillama_metrics
 """
 
-import sqlite3
 import pandas as pd
 from datetime import datetime
 
+from defillama.db import get_conn
+
 def query_database():
     """Query and display latest data from the database"""
     try:
-        conn = sqlite3.connect('defillama_data.db')
+        conn = get_conn()
         
         # Query only the latest entry for each ticker
         query = """
@@ -40,15 +41,15 @@ def query_database():
         print("DefiLlama Metrics Database (Latest Entries)")
         print("=" * 80)
         
-        for _, row in df.iterrows():
-            print(f"Timestamp: {row['timestamp']}")
-            print(f"Ticker: {row['ticker']}")
-            print(f"Market Cap: ${row['market_cap']:,.0f}" if row['market_cap'] else "Market Cap: N/A")
-            print(f"Annual Revenue: ${row['annualized_revenue']:,.0f}" if row['annualized_revenue'] else "Annual Revenue: N/A")
-            print(f"P/E Ratio: {row['pe_ratio']}" if row['pe_ratio'] else "P/E Ratio: N/A")
-            print("-" * 40)
-        
-        conn.close()
+        # Format whole columns at once and print a single table
+        display = pd.DataFrame({
+            'Timestamp': df['timestamp'],
+            'Ticker': df['ticker'],
+            'Market Cap': df['market_cap'].map('${:,.0f}'.format, na_action='ignore'),
+            'Annual Revenue': df['annualized_revenue'].map('${:,.0f}'.format, na_action='ignore'),
+            'P/E Ratio': df['pe_ratio'].map('{:.2f}'.format, na_action='ignore'),
+        }).fillna('N/A')
+        print(display.to_string(index=False))
         
     except Exception as e:
         print(f"Error querying database: {e}")
@@ -56,7 +57,7 @@ def query_database():
 def get_latest_data(ticker=None):
     """Get the latest data for a specific ticker or all tickers"""
     try:
-        conn = sqlite3.connect('defillama_data.db')
+        conn = get_conn()
         
         if ticker:
             query = """
@@ -74,7 +75,6 @@ def get_latest_data(ticker=None):
             """
             df = pd.read_sql_query(query, conn)
         
-        conn.close()
         return df
         
     except Exception as e:
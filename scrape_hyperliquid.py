@@ -3,27 +3,32 @@
 Simple script to scrape Hyperliquid data from DeFiLlama
 """
 
-import subprocess
-import sys
-import os
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from defillama.spiders.defillama_spider import DefillamaSpider
+from query_database import query_database
 
 def scrape_hyperliquid():
     """Scrape Hyperliquid data and store in database"""
     try:
         print("Scraping Hyperliquid data from DeFiLlama...")
-        
-        # Run the spider
-        result = subprocess.run([
-            'scrapy', 'crawl', 'defillama_spider', '-a', 'protocol=hyperliquid'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
+
+        # Run the spider in this process rather than spawning `scrapy crawl`,
+        # keeping Scrapy's log quiet so only this script's messages show
+        settings = get_project_settings()
+        settings.set('LOG_LEVEL', 'WARNING')
+        process = CrawlerProcess(settings)
+        crawler = process.create_crawler(DefillamaSpider)
+        process.crawl(crawler, protocol='hyperliquid')
+        process.start()
+
+        if crawler.stats.get_value('item_scraped_count'):
             print("Successfully scraped Hyperliquid data")
             print("Data has been stored in the database")
         else:
-            print("Error scraping data:")
-            print(result.stderr)
-            
+            print("Error scraping data: no items were scraped")
+
     except Exception as e:
         print(f"Error running scraper: {e}")
 
@@ -32,26 +37,18 @@ def show_latest_data():
     try:
         print("\nLatest Hyperliquid data:")
         print("=" * 50)
-        
-        result = subprocess.run([
-            'python', 'query_database.py'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(result.stdout)
-        else:
-            print("Error querying database:")
-            print(result.stderr)
-            
+
+        query_database()
+
     except Exception as e:
         print(f"Error querying database: {e}")
 
 if __name__ == "__main__":
     print("Hyperliquid Data Scraper")
     print("=" * 30)
-    
+
     # Scrape new data
     scrape_hyperliquid()
-    
+
     # Show latest database contents
-    show_latest_data() 
\ No newline at end of file
+    show_latest_data()